@@ -1,5 +1,4 @@
 import os
-import json
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 from openai import OpenAI
@@ -111,8 +110,7 @@ Always respond with empathy and care, as if you're genuinely concerned about the
 
             schedule_info = "Here's your medication schedule:\n\n"
             for med in medications:
-                times = json.loads(
-                    med.schedule_times) if med.schedule_times else []
+                times = med.schedule_times or []
                 schedule_info += f"• {med.name} ({med.dosage}) - {med.frequency}\n"
                 if times:
                     schedule_info += f"  Times: {', '.join(times)}\n"
@@ -0,0 +1,57 @@
+import hashlib
+import threading
+from functools import wraps
+from typing import Tuple
+from cachetools import TTLCache
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+# Short TTL for data that changes throughout the day (medications, alerts, memory context),
+# longer TTL for user profiles and conversation memory summaries
+short_cache = TTLCache(maxsize=2048, ttl=10)
+long_cache = TTLCache(maxsize=1024, ttl=300)
+
+_cache_lock = threading.Lock()
+_MISSING = object()
+
+def cached_endpoint(cache: TTLCache, namespace: str):
+    """Cache a user-scoped endpoint's result keyed on user_id and query params"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(user_id: int, **params):
+            key = (namespace, user_id, tuple(sorted(params.items())))
+            with _cache_lock:
+                result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+
+            result = func(user_id=user_id, **params)
+            with _cache_lock:
+                cache[key] = result
+            return result
+        return wrapper
+    return decorator
+
+def invalidate_cache(namespace: str, user_id: int):
+    """Drop every cached entry for a user within a namespace"""
+    with _cache_lock:
+        for cache in (short_cache, long_cache):
+            stale_keys = [key for key in list(cache.keys()) if key[0] == namespace and key[1] == user_id]
+            for key in stale_keys:
+                cache.pop(key, None)
+
+def render_json(payload: BaseModel) -> Tuple[bytes, str]:
+    """Serialize a response model once and derive a weak ETag from the body"""
+    body = payload.model_dump_json().encode()
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    return body, etag
+
+def conditional_response(request: Request, rendered: Tuple[bytes, str]) -> Response:
+    """Return 304 Not Modified when the client already holds the current representation"""
+    body, etag = rendered
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in client_tags or etag.removeprefix("W/") in client_tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
@@ -1,19 +1,47 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from datetime import datetime
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from datetime import date, datetime
 from typing import List, Optional, Dict, Any
-import json
+from functools import lru_cache
+import logging
+import threading
 
-from app.database.models import get_session, Session
 from app.database.crud import (
     UserCRUD, MedicationCRUD, ConversationCRUD, ReminderCRUD,
     MedicationLogCRUD, CaregiverAlertCRUD
 )
+from app.api.cache import (
+    cached_endpoint, invalidate_cache, short_cache, long_cache,
+    render_json, conditional_response
+)
 from app.agents.companion_agent import CompanionAgent
 from app.memory.conversation_store import ConversationMemoryStore
 
-app = FastAPI(title="Carely API", description="AI Companion for Elderly Care", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="Carely API",
+    description="AI Companion for Elderly Care",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# Registered before CORS so the JSON 500 still passes through it and carries CORS headers
+@app.middleware("http")
+async def unhandled_exception_middleware(request: Request, call_next):
+    """Log unexpected errors and return them as a JSON 500"""
+    try:
+        return await call_next(request)
+    except Exception as exc:
+        logger.error(f"Unhandled error on {request.method} {request.url.path}", exc_info=exc)
+        return ORJSONResponse({"detail": str(exc)}, status_code=500)
+
+# Compress JSON responses larger than 1 KB
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Add CORS middleware
 app.add_middleware(
@@ -24,8 +52,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize companion agent
-companion_agent = CompanionAgent()
+# One companion agent per process, created on the first chat request
+_agent: Optional[CompanionAgent] = None
+_agent_lock = threading.Lock()
+
+def get_agent() -> CompanionAgent:
+    """Create the companion agent on first use rather than at import time"""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = CompanionAgent()
+    return _agent
+
+@lru_cache(maxsize=2048)
+def get_memory_store(user_id: int) -> ConversationMemoryStore:
+    """Reuse one memory store per user across requests"""
+    return ConversationMemoryStore(user_id)
 
 # Pydantic models for API requests
 class ChatMessage(BaseModel):
@@ -60,9 +103,126 @@ class CustomReminder(BaseModel):
     message: str
     scheduled_time: datetime
 
-# Dependency to get database session
-def get_db_session():
-    return get_session()
+# Pydantic models for API responses, validated straight from ORM objects
+class UserSummaryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    email: Optional[str] = None
+
+class UserListOut(BaseModel):
+    users: List[UserSummaryOut]
+
+class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    preferences: Optional[Dict[str, Any]] = None
+    emergency_contact: Optional[str] = None
+    telegram_chat_id: Optional[str] = None
+    user_type: str
+    created_at: datetime
+
+class ConversationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    message: str
+    response: str
+    sentiment_score: Optional[float] = None
+    sentiment_label: Optional[str] = None
+    timestamp: datetime
+    conversation_type: str
+
+class ChatHistoryOut(BaseModel):
+    conversations: List[ConversationOut]
+
+class MedicationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    dosage: str
+    frequency: str
+    schedule_times: List[str] = []
+    instructions: Optional[str] = None
+    active: bool
+
+    @field_validator("schedule_times", mode="before")
+    @classmethod
+    def _default_schedule_times(cls, value):
+        return value or []
+
+class MedicationListOut(BaseModel):
+    medications: List[MedicationOut]
+
+class MedicationLogOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    medication_id: int
+    scheduled_time: datetime
+    taken_time: Optional[datetime] = None
+    status: str
+    notes: Optional[str] = None
+
+class MedicationLogListOut(BaseModel):
+    logs: List[MedicationLogOut]
+
+class ReminderMedicationOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    name: str
+    dosage: str
+
+class ReminderOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: str = Field(validation_alias="reminder_type")
+    title: str
+    message: str
+    scheduled_time: datetime
+    medication_id: Optional[int] = None
+    medication: Optional[ReminderMedicationOut] = None
+
+class ReminderListOut(BaseModel):
+    reminders: List[ReminderOut]
+
+class AlertOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: str = Field(validation_alias="alert_type")
+    severity: str
+    title: str
+    description: str
+    created_at: datetime
+    resolved: bool
+
+class AlertListOut(BaseModel):
+    alerts: List[AlertOut]
+
+class DailySentimentOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    date: date
+    average_sentiment: float
+    conversation_count: int
+
+class SentimentTrendsOut(BaseModel):
+    sentiment_trends: List[DailySentimentOut]
+
+# Endpoints backed by the synchronous CRUD layer are declared with plain `def`
+# so FastAPI runs them in its threadpool instead of blocking the event loop.
+
+def get_request_time() -> datetime:
+    """Single timestamp shared by everything that handles one request"""
+    return datetime.now()
 
 @app.get("/")
 async def root():
@@ -76,245 +236,176 @@ async def health_check():
 
 # User endpoints
 @app.post("/users/")
-async def create_user(user: UserCreate):
+def create_user(user: UserCreate):
     """Create a new user"""
-    try:
-        new_user = UserCRUD.create_user(
-            name=user.name,
-            email=user.email,
-            phone=user.phone,
-            preferences=user.preferences,
-            emergency_contact=user.emergency_contact
-        )
-        return {"message": "User created successfully", "user_id": new_user.id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/users/")
-async def get_all_users():
+    new_user = UserCRUD.create_user(
+        name=user.name,
+        email=user.email,
+        phone=user.phone,
+        preferences=user.preferences,
+        emergency_contact=user.emergency_contact
+    )
+    return {"message": "User created successfully", "user_id": new_user.id}
+
+@app.get("/users/", response_model=UserListOut)
+def get_all_users():
     """Get all users"""
-    try:
-        users = UserCRUD.get_all_users()
-        return {"users": [{"id": u.id, "name": u.name, "email": u.email} for u in users]}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    users = UserCRUD.get_all_users_basic()
+    return {"users": users}
+
+@cached_endpoint(long_cache, "user")
+def _render_user(user_id: int):
+    user = UserCRUD.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return render_json(UserOut.model_validate(user))
 
-@app.get("/users/{user_id}")
-async def get_user(user_id: int):
+@app.get("/users/{user_id}", response_model=UserOut)
+@app.head("/users/{user_id}", include_in_schema=False)
+def get_user(user_id: int, request: Request):
     """Get user by ID"""
-    try:
-        user = UserCRUD.get_user(user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return conditional_response(request, _render_user(user_id))
 
 # Chat endpoints
 @app.post("/chat/")
 async def chat_with_companion(message: ChatMessage):
     """Chat with the AI companion"""
-    try:
-        response = companion_agent.generate_response(
-            user_id=message.user_id,
-            user_message=message.message,
-            conversation_type=message.conversation_type
-        )
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/chat/history/{user_id}")
-async def get_chat_history(user_id: int, limit: int = 50):
+    # The OpenAI client is synchronous; keep it off the event loop
+    agent = await run_in_threadpool(get_agent)
+    response = await run_in_threadpool(
+        agent.generate_response,
+        user_id=message.user_id,
+        user_message=message.message,
+        conversation_type=message.conversation_type
+    )
+    invalidate_cache("memory_summary", message.user_id)
+    invalidate_cache("memory_context", message.user_id)
+    return response
+
+@app.get("/chat/history/{user_id}", response_model=ChatHistoryOut)
+def get_chat_history(user_id: int, limit: int = 50):
     """Get chat history for a user"""
-    try:
-        conversations = ConversationCRUD.get_user_conversations(user_id, limit)
-        return {
-            "conversations": [
-                {
-                    "id": c.id,
-                    "message": c.message,
-                    "response": c.response,
-                    "sentiment_score": c.sentiment_score,
-                    "sentiment_label": c.sentiment_label,
-                    "timestamp": c.timestamp,
-                    "conversation_type": c.conversation_type
-                }
-                for c in conversations
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    conversations = ConversationCRUD.get_user_conversations(user_id, limit)
+    return {"conversations": conversations}
 
 # Medication endpoints
 @app.post("/medications/")
-async def create_medication(medication: MedicationCreate):
+def create_medication(medication: MedicationCreate):
     """Create a new medication"""
-    try:
-        new_med = MedicationCRUD.create_medication(
-            user_id=medication.user_id,
-            name=medication.name,
-            dosage=medication.dosage,
-            frequency=medication.frequency,
-            schedule_times=medication.schedule_times,
-            instructions=medication.instructions
-        )
-        return {"message": "Medication created successfully", "medication_id": new_med.id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/medications/{user_id}")
-async def get_user_medications(user_id: int):
+    new_med = MedicationCRUD.create_medication(
+        user_id=medication.user_id,
+        name=medication.name,
+        dosage=medication.dosage,
+        frequency=medication.frequency,
+        schedule_times=medication.schedule_times,
+        instructions=medication.instructions
+    )
+    invalidate_cache("medications", medication.user_id)
+    return {"message": "Medication created successfully", "medication_id": new_med.id}
+
+@cached_endpoint(short_cache, "medications")
+def _render_user_medications(user_id: int):
+    medications = MedicationCRUD.get_user_medications(user_id)
+    return render_json(MedicationListOut.model_validate({"medications": medications}, from_attributes=True))
+
+@app.get("/medications/{user_id}", response_model=MedicationListOut)
+@app.head("/medications/{user_id}", include_in_schema=False)
+def get_user_medications(user_id: int, request: Request):
     """Get all medications for a user"""
-    try:
-        medications = MedicationCRUD.get_user_medications(user_id)
-        return {
-            "medications": [
-                {
-                    "id": m.id,
-                    "name": m.name,
-                    "dosage": m.dosage,
-                    "frequency": m.frequency,
-                    "schedule_times": json.loads(m.schedule_times) if m.schedule_times else [],
-                    "instructions": m.instructions,
-                    "active": m.active
-                }
-                for m in medications
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return conditional_response(request, _render_user_medications(user_id))
 
 @app.post("/medications/log/")
-async def log_medication_taken(log: MedicationLog):
+def log_medication_taken(log: MedicationLog, now: datetime = Depends(get_request_time)):
     """Log medication intake"""
-    try:
-        medication_log = MedicationLogCRUD.log_medication_taken(
-            user_id=log.user_id,
-            medication_id=log.medication_id,
-            scheduled_time=datetime.now(),
-            status=log.status,
-            notes=log.notes
-        )
-        return {"message": "Medication logged successfully", "log_id": medication_log.id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    medication_log = MedicationLogCRUD.log_medication_taken(
+        user_id=log.user_id,
+        medication_id=log.medication_id,
+        scheduled_time=now,
+        taken_time=now,
+        status=log.status,
+        notes=log.notes
+    )
+    return {"message": "Medication logged successfully", "log_id": medication_log.id}
 
 @app.get("/medications/adherence/{user_id}")
-async def get_medication_adherence(user_id: int, days: int = 7):
+def get_medication_adherence(user_id: int, days: int = 7, now: datetime = Depends(get_request_time)):
     """Get medication adherence statistics"""
-    try:
-        adherence = MedicationLogCRUD.get_medication_adherence(user_id, days)
-        return adherence
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    adherence = MedicationLogCRUD.get_medication_adherence(user_id, days, now=now)
+    return adherence
+
+@app.get("/medications/logs/{user_id}", response_model=MedicationLogListOut)
+def get_medication_logs(user_id: int, days: int = 7, now: datetime = Depends(get_request_time)):
+    """Get medication logs for a user"""
+    logs = MedicationLogCRUD.get_medication_logs(user_id, days, now=now)
+    return {"logs": logs}
 
 # Reminder endpoints
-@app.get("/reminders/{user_id}")
-async def get_pending_reminders(user_id: int):
+@app.get("/reminders/{user_id}", response_model=ReminderListOut)
+def get_pending_reminders(user_id: int, now: datetime = Depends(get_request_time)):
     """Get pending reminders for a user"""
-    try:
-        reminders = ReminderCRUD.get_pending_reminders(user_id)
-        return {
-            "reminders": [
-                {
-                    "id": r.id,
-                    "type": r.reminder_type,
-                    "title": r.title,
-                    "message": r.message,
-                    "scheduled_time": r.scheduled_time,
-                    "medication_id": r.medication_id
-                }
-                for r in reminders
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    reminders = ReminderCRUD.get_pending_reminders(user_id, now=now)
+    return {"reminders": reminders}
+
+@app.get("/reminders/{user_id}/count")
+def get_pending_reminder_count(user_id: int, now: datetime = Depends(get_request_time)):
+    """Get the number of pending reminders for a user"""
+    count = ReminderCRUD.count_pending_reminders(user_id, now=now)
+    return {"count": count}
 
 @app.post("/reminders/{reminder_id}/complete")
-async def complete_reminder(reminder_id: int):
+def complete_reminder(reminder_id: int, now: datetime = Depends(get_request_time)):
     """Mark reminder as completed"""
-    try:
-        reminder = ReminderCRUD.complete_reminder(reminder_id)
-        if not reminder:
-            raise HTTPException(status_code=404, detail="Reminder not found")
-        return {"message": "Reminder completed successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    reminder = ReminderCRUD.complete_reminder(reminder_id, now=now)
+    if not reminder:
+        raise HTTPException(status_code=404, detail="Reminder not found")
+    return {"message": "Reminder completed successfully"}
 
 # Alert endpoints
-@app.get("/alerts/{user_id}")
-async def get_caregiver_alerts(user_id: int):
+@cached_endpoint(short_cache, "alerts")
+def _render_caregiver_alerts(user_id: int):
+    alerts = CaregiverAlertCRUD.get_unresolved_alerts(user_id)
+    return render_json(AlertListOut.model_validate({"alerts": alerts}, from_attributes=True))
+
+@app.get("/alerts/{user_id}", response_model=AlertListOut)
+@app.head("/alerts/{user_id}", include_in_schema=False)
+def get_caregiver_alerts(user_id: int, request: Request):
     """Get caregiver alerts for a user"""
-    try:
-        alerts = CaregiverAlertCRUD.get_unresolved_alerts(user_id)
-        return {
-            "alerts": [
-                {
-                    "id": a.id,
-                    "type": a.alert_type,
-                    "severity": a.severity,
-                    "title": a.title,
-                    "description": a.description,
-                    "created_at": a.created_at,
-                    "resolved": a.resolved
-                }
-                for a in alerts
-            ]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return conditional_response(request, _render_caregiver_alerts(user_id))
 
 @app.post("/alerts/{alert_id}/resolve")
-async def resolve_alert(alert_id: int):
+def resolve_alert(alert_id: int, now: datetime = Depends(get_request_time)):
     """Resolve a caregiver alert"""
-    try:
-        alert = CaregiverAlertCRUD.resolve_alert(alert_id)
-        if not alert:
-            raise HTTPException(status_code=404, detail="Alert not found")
-        return {"message": "Alert resolved successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    alert = CaregiverAlertCRUD.resolve_alert(alert_id, now=now)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    invalidate_cache("alerts", alert.user_id)
+    return {"message": "Alert resolved successfully"}
 
 # Memory and context endpoints
 @app.get("/memory/{user_id}/summary")
-async def get_conversation_summary(user_id: int, days: int = 7):
+@cached_endpoint(long_cache, "memory_summary")
+def get_conversation_summary(user_id: int, days: int = 7):
     """Get conversation summary for a user"""
-    try:
-        memory_store = ConversationMemoryStore(user_id)
-        summary = memory_store.get_conversation_summary(days)
-        return {"summary": summary}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    memory_store = get_memory_store(user_id)
+    summary = memory_store.get_conversation_summary(days)
+    return {"summary": summary}
 
+# Short TTL: the store's own context cache already misses on new conversations,
+# including ones saved outside this API (scheduler, dashboard)
 @app.get("/memory/{user_id}/context")
-async def get_important_context(user_id: int):
+@cached_endpoint(short_cache, "memory_context")
+def get_important_context(user_id: int):
     """Get important contextual information about a user"""
-    try:
-        memory_store = ConversationMemoryStore(user_id)
-        context = memory_store.get_important_context()
-        return {"context": context}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    memory_store = get_memory_store(user_id)
+    context = memory_store.get_important_context()
+    return {"context": context}
 
 # Analytics endpoints
-@app.get("/analytics/{user_id}/sentiment")
-async def get_sentiment_trends(user_id: int, days: int = 30):
+@app.get("/analytics/{user_id}/sentiment", response_model=SentimentTrendsOut)
+def get_sentiment_trends(user_id: int, days: int = 30):
     """Get sentiment trends for a user"""
-    try:
-        conversations = ConversationCRUD.get_recent_sentiment_data(user_id, days)
-        sentiment_data = [
-            {
-                "date": c.timestamp.date().isoformat(),
-                "sentiment_score": c.sentiment_score,
-                "sentiment_label": c.sentiment_label
-            }
-            for c in conversations
-            if c.sentiment_score is not None
-        ]
-        return {"sentiment_trends": sentiment_data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    daily_sentiment = ConversationCRUD.get_daily_sentiment(user_id, days)
+    return {"sentiment_trends": daily_sentiment}
 
 if __name__ == "__main__":
     import uvicorn
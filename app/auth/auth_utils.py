@@ -1,26 +1,73 @@
 import hashlib
+import hmac
+import os
 import secrets
+from types import MappingProxyType
 from typing import Optional
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from app.database.models import User, get_session
 from sqlmodel import select
 
+# Role hierarchy for permission checks, bound once at import
+_role_level = MappingProxyType({
+    "patient": 0,
+    "caregiver": 1,
+    "admin": 2
+}).get
+
+# Argon2id work factors; tune per deployment via environment variables
+_password_hasher = PasswordHasher(
+    time_cost=int(os.getenv("ARGON2_TIME_COST", "2")),
+    memory_cost=int(os.getenv("ARGON2_MEMORY_COST", str(64 * 1024))),
+    parallelism=int(os.getenv("ARGON2_PARALLELISM", "2"))
+)
+
 def hash_password(password: str) -> str:
-    """Hash a password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash a password using Argon2id"""
+    return _password_hasher.hash(password)
 
 def verify_password(password: str, password_hash: str) -> bool:
     """Verify a password against its hash"""
-    return hash_password(password) == password_hash
+    try:
+        return _password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def _is_legacy_hash(password_hash: str) -> bool:
+    """Check whether a stored hash is an unsalted SHA-256 digest from older releases"""
+    return not password_hash.startswith("$argon2")
+
+def _verify_legacy_password(password: str, password_hash: str) -> bool:
+    """Verify a password against a legacy SHA-256 digest"""
+    digest = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(digest, password_hash)
 
 def authenticate_user(email: str, password: str) -> Optional[User]:
     """Authenticate a user by email and password"""
     with get_session() as session:
         query = select(User).where(User.email == email)
         user = session.exec(query).first()
-        
-        if user and user.password_hash and verify_password(password, user.password_hash):
-            return user
-        return None
+
+        if not user or not user.password_hash:
+            return None
+
+        if _is_legacy_hash(user.password_hash):
+            if not _verify_legacy_password(password, user.password_hash):
+                return None
+            # Upgrade legacy hashes on successful login
+            needs_rehash = True
+        elif verify_password(password, user.password_hash):
+            needs_rehash = _password_hasher.check_needs_rehash(user.password_hash)
+        else:
+            return None
+
+        if needs_rehash:
+            user.password_hash = hash_password(password)
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        return user
 
 def generate_session_token() -> str:
     """Generate a random session token"""
@@ -28,13 +75,4 @@ def generate_session_token() -> str:
 
 def check_permission(user: User, required_role: str) -> bool:
     """Check if user has required permission"""
-    role_hierarchy = {
-        "patient": 0,
-        "caregiver": 1,
-        "admin": 2
-    }
-    
-    user_level = role_hierarchy.get(user.user_type, 0)
-    required_level = role_hierarchy.get(required_role, 0)
-    
-    return user_level >= required_level
+    return _role_level(user.user_type, 0) >= _role_level(required_role, 0)
@@ -1,12 +1,60 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterator, List, Optional
 import json
+from app.auth.auth_utils import hash_password
 from app.database.models import (
     get_session, User, Medication, Conversation, Reminder, 
     MedicationLog, CaregiverAlert, CaregiverPatientAssignment, PersonalEvent
 )
 
+@dataclass
+class PatientOverview:
+    """Headline numbers for a caregiver's patient overview"""
+    adherence: dict
+    avg_sentiment: Optional[float]
+    alert_counts: dict
+
+def _medication_adherence(session: Session, user_id: int, days: int, now: datetime = None) -> dict:
+    """Compute medication adherence statistics within an open session"""
+    cutoff_date = (now or datetime.now()) - timedelta(days=days)
+    query = select(MedicationLog.status, func.count()).where(
+        MedicationLog.user_id == user_id,
+        MedicationLog.scheduled_time >= cutoff_date
+    ).group_by(MedicationLog.status)
+    status_counts = dict(session.exec(query).all())
+    
+    total = sum(status_counts.values())
+    taken = status_counts.get("taken", 0)
+    missed = status_counts.get("missed", 0)
+    
+    return {
+        "total": total,
+        "taken": taken,
+        "missed": missed,
+        "adherence_rate": (taken / total * 100) if total > 0 else 0
+    }
+
+def _avg_sentiment(session: Session, user_id: int, days: int) -> Optional[float]:
+    """Compute the average recent sentiment score within an open session"""
+    cutoff_date = datetime.now() - timedelta(days=days)
+    query = select(func.avg(Conversation.sentiment_score)).where(
+        Conversation.user_id == user_id,
+        Conversation.timestamp >= cutoff_date
+    )
+    return session.exec(query).one()
+
+def _unresolved_alert_counts(session: Session, user_id: int = None) -> dict:
+    """Count unresolved alerts per severity within an open session"""
+    query = select(CaregiverAlert.severity, func.count()).where(CaregiverAlert.resolved == False)
+    if user_id:
+        query = query.where(CaregiverAlert.user_id == user_id)
+    query = query.group_by(CaregiverAlert.severity)
+    return dict(session.exec(query).all())
+
 class UserCRUD:
     @staticmethod
     def create_user(name: str, email: str = None, phone: str = None, 
@@ -14,17 +62,13 @@ class UserCRUD:
                    user_type: str = "patient", password: str = None) -> User:
         """Create a new user"""
         with get_session() as session:
-            preferences_json = json.dumps(preferences) if preferences else None
-            password_hash = None
-            if password:
-                import hashlib
-                password_hash = hashlib.sha256(password.encode()).hexdigest()
+            password_hash = hash_password(password) if password else None
             
             user = User(
                 name=name,
                 email=email,
                 phone=phone,
-                preferences=preferences_json,
+                preferences=preferences or None,
                 emergency_contact=emergency_contact,
                 user_type=user_type,
                 password_hash=password_hash
@@ -45,6 +89,18 @@ class UserCRUD:
         """Get all users"""
         with get_session() as session:
             return session.exec(select(User)).all()
+    
+    @staticmethod
+    def any_users() -> bool:
+        """Check whether at least one user exists"""
+        with get_session() as session:
+            return session.exec(select(User.id).limit(1)).first() is not None
+    
+    @staticmethod
+    def get_all_users_basic() -> List:
+        """Get id, name and email for all users without loading full rows"""
+        with get_session() as session:
+            return session.exec(select(User.id, User.name, User.email)).all()
 
 class MedicationCRUD:
     @staticmethod
@@ -57,7 +113,7 @@ class MedicationCRUD:
                 name=name,
                 dosage=dosage,
                 frequency=frequency,
-                schedule_times=json.dumps(schedule_times),
+                schedule_times=schedule_times,
                 instructions=instructions
             )
             session.add(medication)
@@ -108,13 +164,42 @@ class ConversationCRUD:
             return conversation
     
     @staticmethod
-    def get_user_conversations(user_id: int, limit: int = 50) -> List[Conversation]:
-        """Get recent conversations for a user"""
+    def bulk_save_conversations(rows: List[dict]) -> int:
+        """Save many conversations in a single transaction"""
+        with get_session() as session:
+            session.execute(insert(Conversation), rows)
+            session.commit()
+            return len(rows)
+    
+    @staticmethod
+    def get_user_conversations(user_id: int, limit: int = 50, since: Optional[datetime] = None,
+                               conversation_type: Optional[str] = None, offset: int = 0) -> List[Conversation]:
+        """Get recent conversations for a user, optionally since a time and of one type, newest first"""
+        with get_session() as session:
+            query = select(Conversation).where(Conversation.user_id == user_id)
+            if since is not None:
+                query = query.where(Conversation.timestamp >= since)
+            if conversation_type is not None:
+                query = query.where(Conversation.conversation_type == conversation_type)
+            # id breaks timestamp ties so offset pages never overlap
+            query = query.order_by(Conversation.timestamp.desc(), Conversation.id.desc()).offset(offset).limit(limit)
+            return session.exec(query).all()
+    
+    @staticmethod
+    def iter_user_conversations(user_id: int, limit: int = 100) -> Iterator[Conversation]:
+        """Stream recent conversations for a user in batches instead of loading them all at once"""
         with get_session() as session:
             query = select(Conversation).where(
                 Conversation.user_id == user_id
-            ).order_by(Conversation.timestamp.desc()).limit(limit)
-            return session.exec(query).all()
+            ).order_by(Conversation.timestamp.desc()).limit(limit).execution_options(yield_per=500)
+            yield from session.exec(query)
+    
+    @staticmethod
+    def get_latest_conversation_id(user_id: int) -> Optional[int]:
+        """Get the id of a user's most recent conversation"""
+        with get_session() as session:
+            query = select(func.max(Conversation.id)).where(Conversation.user_id == user_id)
+            return session.exec(query).one()
     
     @staticmethod
     def get_recent_sentiment_data(user_id: int, days: int = 7) -> List[Conversation]:
@@ -127,6 +212,23 @@ class ConversationCRUD:
                 Conversation.sentiment_score.isnot(None)
             ).order_by(Conversation.timestamp.desc())
             return session.exec(query).all()
+    
+    @staticmethod
+    def get_daily_sentiment(user_id: int, days: int = 30) -> List:
+        """Get average sentiment and conversation count per day"""
+        with get_session() as session:
+            cutoff_date = datetime.now() - timedelta(days=days)
+            day = func.date(Conversation.timestamp)
+            query = select(
+                day.label("date"),
+                func.avg(Conversation.sentiment_score).label("average_sentiment"),
+                func.count().label("conversation_count")
+            ).where(
+                Conversation.user_id == user_id,
+                Conversation.timestamp >= cutoff_date,
+                Conversation.sentiment_score.isnot(None)
+            ).group_by(day).order_by(day)
+            return session.exec(query).all()
 
 class ReminderCRUD:
     @staticmethod
@@ -148,25 +250,36 @@ class ReminderCRUD:
             return reminder
     
     @staticmethod
-    def get_pending_reminders(user_id: int = None) -> List[Reminder]:
-        """Get pending reminders"""
+    def get_pending_reminders(user_id: int = None, now: datetime = None) -> List[Reminder]:
+        """Get pending reminders with their medication preloaded"""
         with get_session() as session:
-            query = select(Reminder).where(
+            query = select(Reminder).options(selectinload(Reminder.medication)).where(
                 Reminder.completed == False,
-                Reminder.scheduled_time <= datetime.now()
+                Reminder.scheduled_time <= (now or datetime.now())
             )
             if user_id:
                 query = query.where(Reminder.user_id == user_id)
             return session.exec(query).all()
     
     @staticmethod
-    def complete_reminder(reminder_id: int) -> Optional[Reminder]:
+    def count_pending_reminders(user_id: int, now: datetime = None) -> int:
+        """Count pending reminders without loading them"""
+        with get_session() as session:
+            query = select(func.count()).select_from(Reminder).where(
+                Reminder.user_id == user_id,
+                Reminder.completed == False,
+                Reminder.scheduled_time <= (now or datetime.now())
+            )
+            return session.exec(query).one()
+    
+    @staticmethod
+    def complete_reminder(reminder_id: int, now: datetime = None) -> Optional[Reminder]:
         """Mark reminder as completed"""
         with get_session() as session:
             reminder = session.get(Reminder, reminder_id)
             if reminder:
                 reminder.completed = True
-                reminder.completed_at = datetime.now()
+                reminder.completed_at = now or datetime.now()
                 session.add(reminder)
                 session.commit()
                 session.refresh(reminder)
@@ -193,27 +306,29 @@ class MedicationLogCRUD:
             return log
     
     @staticmethod
-    def get_medication_adherence(user_id: int, days: int = 7) -> dict:
+    def bulk_log(rows: List[dict]) -> int:
+        """Log many medication doses in a single transaction"""
+        with get_session() as session:
+            session.execute(insert(MedicationLog), rows)
+            session.commit()
+            return len(rows)
+    
+    @staticmethod
+    def get_medication_adherence(user_id: int, days: int = 7, now: datetime = None) -> dict:
         """Get medication adherence statistics"""
         with get_session() as session:
-            cutoff_date = datetime.now() - timedelta(days=days)
+            return _medication_adherence(session, user_id, days, now)
+    
+    @staticmethod
+    def get_medication_logs(user_id: int, days: int = 7, now: datetime = None) -> List[MedicationLog]:
+        """Get medication logs for the last N days, oldest first"""
+        with get_session() as session:
+            cutoff_date = (now or datetime.now()) - timedelta(days=days)
             query = select(MedicationLog).where(
                 MedicationLog.user_id == user_id,
                 MedicationLog.scheduled_time >= cutoff_date
-            )
-            logs = session.exec(query).all()
-            
-            total = len(logs)
-            taken = len([log for log in logs if log.status == "taken"])
-            missed = len([log for log in logs if log.status == "missed"])
-            
-            return {
-                "total": total,
-                "taken": taken,
-                "missed": missed,
-                "adherence_rate": (taken / total * 100) if total > 0 else 0,
-                "logs": logs
-            }
+            ).order_by(MedicationLog.scheduled_time)
+            return session.exec(query).all()
 
 class CaregiverAlertCRUD:
     @staticmethod
@@ -244,13 +359,13 @@ class CaregiverAlertCRUD:
             return session.exec(query).all()
     
     @staticmethod
-    def resolve_alert(alert_id: int) -> Optional[CaregiverAlert]:
+    def resolve_alert(alert_id: int, now: datetime = None) -> Optional[CaregiverAlert]:
         """Resolve an alert"""
         with get_session() as session:
             alert = session.get(CaregiverAlert, alert_id)
             if alert:
                 alert.resolved = True
-                alert.resolved_at = datetime.now()
+                alert.resolved_at = now or datetime.now()
                 session.add(alert)
                 session.commit()
                 session.refresh(alert)
@@ -273,6 +388,16 @@ class CaregiverPatientCRUD:
             session.refresh(assignment)
             return assignment
     
+    @staticmethod
+    def get_patient_overview_bundle(patient_id: int, days: int = 7) -> PatientOverview:
+        """Get adherence, average sentiment and unresolved alert counts in one session"""
+        with get_session() as session:
+            return PatientOverview(
+                adherence=_medication_adherence(session, patient_id, days),
+                avg_sentiment=_avg_sentiment(session, patient_id, days),
+                alert_counts=_unresolved_alert_counts(session, patient_id)
+            )
+    
     @staticmethod
     def get_caregiver_patients(caregiver_id: int) -> List[User]:
         """Get all patients assigned to a caregiver"""
@@ -1,18 +1,51 @@
-from sqlmodel import SQLModel, Field, create_engine, Session
+from sqlmodel import SQLModel, Field, Relationship, create_engine, Session
+from sqlalchemy import Column, Index, JSON, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime, time
 from typing import Optional, List
+import os
 import sqlite3
+from utils.severity import get_severity_code
 
 # Database setup
-DATABASE_URL = "sqlite:///carely.db"
-engine = create_engine(DATABASE_URL, echo=False)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///carely.db")
+
+def _engine_options(url: str) -> dict:
+    """Pool settings so sessions check out warm connections instead of reconnecting"""
+    options = {"echo": False, "pool_pre_ping": True}
+    if url.startswith("sqlite"):
+        # Streamlit, FastAPI workers and the scheduler share connections across threads
+        options["connect_args"] = {"check_same_thread": False}
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # In-memory databases only exist on a single connection
+            options["poolclass"] = StaticPool
+            return options
+    options["pool_size"] = int(os.getenv("DB_POOL_SIZE", "20"))
+    options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL so readers are not blocked behind the single writer"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+SessionLocal = sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    email: Optional[str] = None
+    email: Optional[str] = Field(default=None, index=True)
     phone: Optional[str] = None
-    preferences: Optional[str] = None  # JSON string for preferences
+    preferences: Optional[dict] = Field(default=None, sa_column=Column(JSON))
     emergency_contact: Optional[str] = None
     telegram_chat_id: Optional[str] = None  # Telegram chat ID for notifications
     user_type: str = Field(default="patient")  # patient, caregiver, admin
@@ -25,12 +58,14 @@ class Medication(SQLModel, table=True):
     name: str
     dosage: str
     frequency: str  # e.g., "daily", "twice_daily", "weekly"
-    schedule_times: str  # JSON string of times like ["09:00", "21:00"]
+    schedule_times: List[str] = Field(default_factory=list, sa_column=Column(JSON))  # Times like ["09:00", "21:00"]
     instructions: Optional[str] = None
     active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=datetime.now)
 
 class Conversation(SQLModel, table=True):
+    __table_args__ = (Index("ix_conv_user_ts", "user_id", "timestamp"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     message: str
@@ -41,6 +76,8 @@ class Conversation(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.now)
 
 class Reminder(SQLModel, table=True):
+    __table_args__ = (Index("ix_reminder_user_completed_time", "user_id", "completed", "scheduled_time"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     reminder_type: str  # medication, checkin, alert
@@ -52,7 +89,11 @@ class Reminder(SQLModel, table=True):
     medication_id: Optional[int] = Field(default=None, foreign_key="medication.id")
     created_at: datetime = Field(default_factory=datetime.now)
 
+    medication: Optional[Medication] = Relationship()
+
 class MedicationLog(SQLModel, table=True):
+    __table_args__ = (Index("ix_medlog_user_time", "user_id", "scheduled_time"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     medication_id: int = Field(foreign_key="medication.id")
@@ -63,6 +104,8 @@ class MedicationLog(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.now)
 
 class CaregiverAlert(SQLModel, table=True):
+    __table_args__ = (Index("ix_alert_user_resolved_created", "user_id", "resolved", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     alert_type: str  # medication_missed, mood_concern, emergency
@@ -73,6 +116,11 @@ class CaregiverAlert(SQLModel, table=True):
     resolved_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.now)
 
+    @property
+    def severity_code(self) -> int:
+        """Severity as a small integer for tuple lookups"""
+        return get_severity_code(self.severity)
+
 class CaregiverPatientAssignment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     caregiver_id: int = Field(foreign_key="user.id")
@@ -95,7 +143,12 @@ class PersonalEvent(SQLModel, table=True):
 def create_tables():
     """Create all database tables"""
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add any indexes
+    # introduced after the database was first created
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 def get_session():
     """Get database session"""
-    return Session(engine)
+    return SessionLocal()
@@ -1,8 +1,68 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable
 from datetime import datetime, timedelta
+from bisect import bisect_left
+from collections import Counter, deque
+from itertools import groupby
 import json
+import re
+import threading
+import numpy as np
+from cachetools import TTLCache
 from app.database.crud import ConversationCRUD
 
+# Important context keyed on (user_id, latest conversation id), so a new conversation misses
+_CONTEXT_CACHE = TTLCache(maxsize=1024, ttl=60)
+_context_cache_lock = threading.Lock()
+
+# Simple keyword extraction - could be enhanced with NLP
+_TOPIC_KEYWORDS = {
+    "health": ("pain", "doctor", "hospital", "medicine", "sick", "health", "feel"),
+    "family": ("family", "children", "grandchildren", "spouse", "daughter", "son"),
+    "activities": ("walk", "exercise", "garden", "read", "watch", "hobby"),
+    "sleep": ("sleep", "tired", "rest", "bed", "night"),
+    "food": ("eat", "food", "hungry", "meal", "cook", "dinner", "lunch"),
+    "social": ("friend", "visit", "call", "lonely", "social", "people")
+}
+
+_CONCERN_KEYWORDS = {
+    "pain": ("pain", "hurt", "ache", "sore"),
+    "sleep": ("sleep", "insomnia", "tired", "rest"),
+    "loneliness": ("lonely", "alone", "isolated", "miss"),
+    "confusion": ("confused", "forgot", "remember", "memory"),
+    "anxiety": ("worried", "anxious", "scared", "nervous")
+}
+
+# Words that mark a conversation as medication-related
+_MEDICATION_WORDS = ("medication", "pill", "medicine", "dose")
+
+# Common medication keywords, and indicator words that are not drug names themselves
+_MED_INDICATORS = frozenset(("pill", "medication", "medicine", "dose", "tablet", "take", "prescribed"))
+_MED_NAME_EXCLUSIONS = frozenset(("medicine", "medication", "tablet", "prescribed"))
+
+# Word-start anchored so "pills" or "taken" still match but "mistake" does not
+_MEDICATION_WORD_RE = re.compile(r"\b(?:%s)" % "|".join(_MEDICATION_WORDS))
+_MED_INDICATOR_RE = re.compile(r"\b(?:%s)" % "|".join(sorted(_MED_INDICATORS)))
+
+# Sentiment descriptions; a score above the i-th threshold earns at least the (i+1)-th label
+_SENTIMENT_THRESHOLDS = (-0.6, -0.2, 0.2, 0.6)
+_SENTIMENT_LABELS = ("Concerning/negative", "Somewhat negative", "Neutral", "Positive", "Very positive")
+
+# Parts of the day, in the order ties are resolved for the most active time
+_TIME_BUCKETS = ("morning", "afternoon", "evening", "night")
+
+# Part of the day for each hour 0-23
+_HOUR_TO_BUCKET = ("night",) * 6 + ("morning",) * 6 + ("afternoon",) * 5 + ("evening",) * 5 + ("night",) * 2
+
+_TOPIC_OF = {keyword: topic for topic, keywords in _TOPIC_KEYWORDS.items() for keyword in keywords}
+_CONCERN_OF = {keyword: concern for concern, keywords in _CONCERN_KEYWORDS.items() for keyword in keywords}
+
+# All topic and concern keywords in one pattern, so each message is scanned once.
+# The lookahead reports overlapping hits too ("children" inside "grandchildren"),
+# matching what a separate substring search per keyword would find.
+_KEYWORD_RE = re.compile("(?=(%s))" % "|".join(
+    re.escape(keyword) for keyword in sorted(_TOPIC_OF.keys() | _CONCERN_OF.keys(), key=len, reverse=True)
+))
+
 class ConversationMemoryStore:
     """
     Handles conversation memory and context for the AI companion
@@ -14,221 +74,211 @@ class ConversationMemoryStore:
     
     def get_conversation_summary(self, days: int = 7) -> str:
         """Get a summary of recent conversations for context"""
-        conversations = ConversationCRUD.get_user_conversations(
-            self.user_id, 
-            limit=50
-        )
-        
-        # Filter by date
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_convs = [
-            conv for conv in conversations 
-            if conv.timestamp >= cutoff_date
-        ]
+        since = datetime.now() - timedelta(days=days)
+        recent_convs = ConversationCRUD.get_user_conversations(self.user_id, limit=50, since=since)
         
         if not recent_convs:
             return "No recent conversations found."
         
-        # Group conversations by day
-        daily_summaries = {}
-        for conv in recent_convs:
-            date_key = conv.timestamp.date()
-            if date_key not in daily_summaries:
-                daily_summaries[date_key] = []
-            daily_summaries[date_key].append(conv)
-        
         # Create summary
-        summary = f"Conversation summary for {self.user_id} (last {days} days):\n\n"
+        parts = [f"Conversation summary for {self.user_id} (last {days} days):\n\n"]
         
-        for date, convs in sorted(daily_summaries.items(), reverse=True):
-            summary += f"=== {date.strftime('%B %d, %Y')} ===\n"
+        # Conversations arrive newest first, so each day's group is contiguous
+        for date, day_convs in groupby(recent_convs, key=lambda c: c.timestamp.date()):
+            convs = list(day_convs)
+            parts.append(f"=== {date:%B %d, %Y} ===\n")
             
             # Sentiment analysis for the day
             sentiments = [c.sentiment_score for c in convs if c.sentiment_score is not None]
             if sentiments:
                 avg_sentiment = sum(sentiments) / len(sentiments)
                 sentiment_desc = self._sentiment_to_description(avg_sentiment)
-                summary += f"Overall mood: {sentiment_desc}\n"
+                parts.append(f"Overall mood: {sentiment_desc}\n")
             
             # Key topics/concerns
             topics = self._extract_topics(convs)
             if topics:
-                summary += f"Topics discussed: {', '.join(topics)}\n"
+                parts.append(f"Topics discussed: {', '.join(topics)}\n")
             
             # Medication mentions
             med_mentions = self._extract_medication_mentions(convs)
             if med_mentions:
-                summary += f"Medications mentioned: {', '.join(med_mentions)}\n"
+                parts.append(f"Medications mentioned: {', '.join(med_mentions)}\n")
             
-            summary += "\n"
+            parts.append("\n")
         
-        return summary
+        return "".join(parts)
     
     def get_important_context(self) -> Dict[str, Any]:
         """Get important contextual information about the user"""
-        conversations = ConversationCRUD.get_user_conversations(self.user_id, limit=100)
+        cache_key = (self.user_id, ConversationCRUD.get_latest_conversation_id(self.user_id))
+        with _context_cache_lock:
+            context = _CONTEXT_CACHE.get(cache_key)
+        if context is not None:
+            return context
+        
+        # Stream rows straight into the stats pass rather than holding them all
+        stats = self._compute_stats(ConversationCRUD.iter_user_conversations(self.user_id, limit=100))
         
         context = {
-            "mood_patterns": self._analyze_mood_patterns(conversations),
-            "medication_patterns": self._analyze_medication_patterns(conversations),
-            "common_concerns": self._extract_common_concerns(conversations),
-            "preferred_topics": self._extract_preferred_topics(conversations),
-            "communication_style": self._analyze_communication_style(conversations)
+            "mood_patterns": self._analyze_mood_patterns(stats),
+            "medication_patterns": self._analyze_medication_patterns(stats),
+            "common_concerns": self._extract_common_concerns(stats),
+            "preferred_topics": self._extract_preferred_topics(stats),
+            "communication_style": self._analyze_communication_style(stats)
         }
         
+        with _context_cache_lock:
+            _CONTEXT_CACHE[cache_key] = context
         return context
     
+    def _compute_stats(self, conversations: Iterable) -> Dict[str, Any]:
+        """Walk the conversations once, collecting what every context analyzer needs"""
+        total_conversations = 0
+        sentiments = []
+        medication_discussions = 0
+        recent_medication_sentiments = deque(maxlen=10)  # last 10 medication-related scores
+        concern_counts = {concern: 0 for concern in _CONCERN_KEYWORDS}
+        preferred_topics = set()  # topics of conversations with clearly positive sentiment
+        time_counts = dict.fromkeys(_TIME_BUCKETS, 0)
+        total_chars = 0
+        
+        for conv in conversations:
+            message = conv.message
+            text_lower = message.lower()
+            score = conv.sentiment_score
+            positive = score is not None and score > 0.3
+            
+            total_conversations += 1
+            total_chars += len(message)
+            if score is not None:
+                sentiments.append(score)
+            
+            if conv.conversation_type == "medication" or _MEDICATION_WORD_RE.search(text_lower):
+                medication_discussions += 1
+                recent_medication_sentiments.append(score)
+            
+            for match in _KEYWORD_RE.finditer(text_lower):
+                keyword = match.group(1)
+                concern = _CONCERN_OF.get(keyword)
+                if concern:
+                    concern_counts[concern] += 1
+                if positive and keyword in _TOPIC_OF:
+                    preferred_topics.add(_TOPIC_OF[keyword])
+            
+            time_counts[_HOUR_TO_BUCKET[conv.timestamp.hour]] += 1
+        
+        return {
+            "total_conversations": total_conversations,
+            "sentiments": sentiments,
+            "medication_discussions": medication_discussions,
+            "recent_medication_sentiments": recent_medication_sentiments,
+            "preferred_topics": preferred_topics,
+            "concern_counts": concern_counts,
+            "time_counts": time_counts,
+            "total_chars": total_chars
+        }
+    
     def _sentiment_to_description(self, score: float) -> str:
         """Convert sentiment score to human-readable description"""
-        if score > 0.6:
-            return "Very positive"
-        elif score > 0.2:
-            return "Positive"
-        elif score > -0.2:
-            return "Neutral"
-        elif score > -0.6:
-            return "Somewhat negative"
-        else:
-            return "Concerning/negative"
+        return _SENTIMENT_LABELS[bisect_left(_SENTIMENT_THRESHOLDS, score)]
     
     def _extract_topics(self, conversations: List) -> List[str]:
         """Extract main topics from conversations"""
-        # Simple keyword extraction - could be enhanced with NLP
-        topic_keywords = {
-            "health": ["pain", "doctor", "hospital", "medicine", "sick", "health", "feel"],
-            "family": ["family", "children", "grandchildren", "spouse", "daughter", "son"],
-            "activities": ["walk", "exercise", "garden", "read", "watch", "hobby"],
-            "sleep": ["sleep", "tired", "rest", "bed", "night"],
-            "food": ["eat", "food", "hungry", "meal", "cook", "dinner", "lunch"],
-            "social": ["friend", "visit", "call", "lonely", "social", "people"]
-        }
-        
         found_topics = set()
-        all_text = " ".join([conv.message.lower() for conv in conversations])
         
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in all_text for keyword in keywords):
-                found_topics.add(topic)
+        for conv in conversations:
+            for match in _KEYWORD_RE.finditer(conv.message.lower()):
+                topic = _TOPIC_OF.get(match.group(1))
+                if topic:
+                    found_topics.add(topic)
         
         return list(found_topics)
     
     def _extract_medication_mentions(self, conversations: List) -> List[str]:
-        """Extract medication names mentioned in conversations"""
-        medications = set()
-        
-        # Common medication keywords
-        med_indicators = ["pill", "medication", "medicine", "dose", "tablet", "take", "prescribed"]
+        """Extract the most frequently mentioned medication names in conversations"""
+        medications = Counter()
         
         for conv in conversations:
-            text_lower = conv.message.lower()
             # If medication indicators are present, look for potential drug names
-            if any(indicator in text_lower for indicator in med_indicators):
+            text_lower = conv.message.lower()
+            if _MED_INDICATOR_RE.search(text_lower):
                 # This is a simplified approach - in production, you'd use medical NLP
-                words = text_lower.split()
-                for word in words:
-                    if len(word) > 4 and not word in ["medicine", "medication", "tablet", "prescribed"]:
+                for word in text_lower.split():
+                    if len(word) > 4 and word not in _MED_NAME_EXCLUSIONS:
                         # Basic filtering for potential medication names
-                        medications.add(word.capitalize())
+                        medications[word.capitalize()] += 1
         
-        return list(medications)[:5]  # Return top 5
+        return [name for name, _ in medications.most_common(5)]  # Return top 5
     
-    def _analyze_mood_patterns(self, conversations: List) -> Dict[str, Any]:
+    def _analyze_mood_patterns(self, stats: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze mood patterns over time"""
-        if not conversations:
-            return {}
-        
-        sentiments = [c.sentiment_score for c in conversations if c.sentiment_score is not None]
+        sentiments = stats["sentiments"]
         if not sentiments:
             return {}
         
+        scores = np.fromiter(sentiments, dtype=np.float64, count=len(sentiments))
+        positive = int((scores > 0.2).sum())
+        negative = int((scores < -0.2).sum())
+        
+        # Scores are newest first: compare the latest five against the earliest five
+        improving = scores.size >= 5 and scores[:5].mean() > scores[-5:].mean()
+        
         return {
-            "average_mood": sum(sentiments) / len(sentiments),
-            "mood_trend": "improving" if sentiments[-5:] > sentiments[:5] else "stable",
-            "total_conversations": len(conversations),
+            "average_mood": float(scores.mean()),
+            "mood_trend": "improving" if improving else "stable",
+            "total_conversations": stats["total_conversations"],
             "sentiment_distribution": {
-                "positive": len([s for s in sentiments if s > 0.2]),
-                "neutral": len([s for s in sentiments if -0.2 <= s <= 0.2]),
-                "negative": len([s for s in sentiments if s < -0.2])
+                "positive": positive,
+                "neutral": scores.size - positive - negative,
+                "negative": negative
             }
         }
     
-    def _analyze_medication_patterns(self, conversations: List) -> Dict[str, Any]:
+    def _analyze_medication_patterns(self, stats: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze medication-related conversation patterns"""
-        med_conversations = [
-            c for c in conversations 
-            if c.conversation_type == "medication" or 
-               any(word in c.message.lower() for word in ["medication", "pill", "medicine", "dose"])
-        ]
-        
         return {
-            "medication_discussions": len(med_conversations),
+            "medication_discussions": stats["medication_discussions"],
             "recent_medication_concerns": len([
-                c for c in med_conversations[-10:] 
-                if c.sentiment_score and c.sentiment_score < -0.3
+                score for score in stats["recent_medication_sentiments"]
+                if score and score < -0.3
             ])
         }
     
-    def _extract_common_concerns(self, conversations: List) -> List[str]:
+    def _extract_common_concerns(self, stats: Dict[str, Any]) -> List[str]:
         """Extract common concerns or recurring themes"""
-        concern_keywords = {
-            "pain": ["pain", "hurt", "ache", "sore"],
-            "sleep": ["sleep", "insomnia", "tired", "rest"],
-            "loneliness": ["lonely", "alone", "isolated", "miss"],
-            "confusion": ["confused", "forgot", "remember", "memory"],
-            "anxiety": ["worried", "anxious", "scared", "nervous"]
+        concerns = {
+            concern: count
+            for concern, count in stats["concern_counts"].items()
+            if count > 0
         }
         
-        concerns = {}
-        all_messages = " ".join([conv.message.lower() for conv in conversations])
-        
-        for concern, keywords in concern_keywords.items():
-            count = sum(all_messages.count(keyword) for keyword in keywords)
-            if count > 0:
-                concerns[concern] = count
-        
         # Return top concerns
         return sorted(concerns.keys(), key=lambda x: concerns[x], reverse=True)[:3]
     
-    def _extract_preferred_topics(self, conversations: List) -> List[str]:
+    def _extract_preferred_topics(self, stats: Dict[str, Any]) -> List[str]:
         """Extract topics the user seems to enjoy discussing"""
-        positive_convs = [
-            c for c in conversations 
-            if c.sentiment_score and c.sentiment_score > 0.3
-        ]
-        
-        return self._extract_topics(positive_convs)[:3]
+        return list(stats["preferred_topics"])[:3]
     
-    def _analyze_communication_style(self, conversations: List) -> Dict[str, Any]:
+    def _analyze_communication_style(self, stats: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze the user's communication preferences"""
-        if not conversations:
+        total_conversations = stats["total_conversations"]
+        if not total_conversations:
             return {}
         
-        total_chars = sum(len(conv.message) for conv in conversations)
-        avg_message_length = total_chars / len(conversations)
+        avg_message_length = stats["total_chars"] / total_conversations
         
         return {
             "average_message_length": avg_message_length,
             "prefers_short_messages": avg_message_length < 50,
-            "total_conversations": len(conversations),
-            "most_active_time": self._find_most_active_time(conversations)
+            "total_conversations": total_conversations,
+            "most_active_time": self._find_most_active_time(stats)
         }
     
-    def _find_most_active_time(self, conversations: List) -> str:
+    def _find_most_active_time(self, stats: Dict[str, Any]) -> str:
         """Find when the user is most active in conversations"""
-        if not conversations:
+        if not stats["total_conversations"]:
             return "unknown"
         
-        time_counts = {"morning": 0, "afternoon": 0, "evening": 0, "night": 0}
-        
-        for conv in conversations:
-            hour = conv.timestamp.hour
-            if 6 <= hour < 12:
-                time_counts["morning"] += 1
-            elif 12 <= hour < 17:
-                time_counts["afternoon"] += 1
-            elif 17 <= hour < 22:
-                time_counts["evening"] += 1
-            else:
-                time_counts["night"] += 1
-        
+        time_counts = stats["time_counts"]
         return max(time_counts.keys(), key=lambda x: time_counts[x])
@@ -2,9 +2,9 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from datetime import datetime, timedelta, time
-import json
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional
 
 from app.database.crud import (
     ReminderCRUD, MedicationCRUD, MedicationLogCRUD, 
@@ -16,6 +16,10 @@ from app.agents.companion_agent import CompanionAgent
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One scheduler per process, however many times the app script reruns or imports this
+_scheduler: Optional["ReminderScheduler"] = None
+_scheduler_lock = threading.Lock()
+
 class ReminderScheduler:
     def __init__(self):
         self.scheduler = BackgroundScheduler()
@@ -98,9 +102,7 @@ class ReminderScheduler:
                         continue
                     
                     try:
-                        schedule_times = json.loads(medication.schedule_times)
-                        
-                        for time_str in schedule_times:
+                        for time_str in medication.schedule_times:
                             # Parse time string (expected format: "HH:MM")
                             hour, minute = map(int, time_str.split(':'))
                             
@@ -115,7 +117,7 @@ class ReminderScheduler:
                                 replace_existing=True
                             )
                             
-                    except (json.JSONDecodeError, ValueError) as e:
+                    except ValueError as e:
                         logger.error(f"Invalid schedule format for medication {medication.id}: {e}")
             
             logger.info("Medication reminders scheduled for all users")
@@ -253,7 +255,7 @@ class ReminderScheduler:
                 
                 # Check for missed medications in the last 2 hours
                 recent_missed = 0
-                for log in adherence.get("logs", []):
+                for log in MedicationLogCRUD.get_medication_logs(user.id, days=1):
                     if (log.status == "missed" and 
                         current_time - log.scheduled_time < timedelta(hours=2)):
                         recent_missed += 1
@@ -377,3 +379,12 @@ Recommendations:
             
         except Exception as e:
             logger.error(f"Failed to send custom reminder: {e}")
+
+def start_scheduler() -> ReminderScheduler:
+    """Start the reminder scheduler thread once per process and return the shared scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+            threading.Thread(target=_scheduler.start, name="reminder-scheduler", daemon=True).start()
+        return _scheduler
@@ -10,14 +10,16 @@ def initialize_sample_data():
     """Initialize the database with sample data for testing"""
     
     # Check if data already exists
-    existing_users = UserCRUD.get_all_users()
-    if existing_users:
+    if UserCRUD.any_users():
         print("Sample data already exists, skipping initialization")
         return
     
     try:
         print("Initializing sample data...")
         
+        # One reference time so every sample timestamp is consistent
+        now = datetime.now()
+        
         # Create sample users
         user1 = UserCRUD.create_user(
             name="Dorothy Johnson",
@@ -102,7 +104,7 @@ def initialize_sample_data():
             event_type="family_event",
             title="Grandson's Birthday",
             description="Tommy turns 10 years old",
-            event_date=datetime.now() + timedelta(days=15),
+            event_date=now + timedelta(days=15),
             importance="high"
         )
         
@@ -111,7 +113,7 @@ def initialize_sample_data():
             event_type="appointment",
             title="Doctor's Appointment",
             description="Regular checkup with Dr. Smith",
-            event_date=datetime.now() + timedelta(days=7),
+            event_date=now + timedelta(days=7),
             importance="medium"
         )
         
@@ -120,7 +122,7 @@ def initialize_sample_data():
             event_type="hobby",
             title="Chess Club Meeting",
             description="Weekly chess club at community center",
-            event_date=datetime.now() + timedelta(days=3),
+            event_date=now + timedelta(days=3),
             recurring=True,
             importance="medium"
         )
@@ -184,7 +186,7 @@ def initialize_sample_data():
                 "sentiment_score": 0.7,
                 "sentiment_label": "positive",
                 "conversation_type": "checkin",
-                "timestamp": datetime.now() - timedelta(hours=2)
+                "timestamp": now - timedelta(hours=2)
             },
             {
                 "message": "I took my Lisinopril and Vitamin D with breakfast. The Metformin I'll take tonight.",
@@ -192,7 +194,7 @@ def initialize_sample_data():
                 "sentiment_score": 0.4,
                 "sentiment_label": "positive",
                 "conversation_type": "medication",
-                "timestamp": datetime.now() - timedelta(hours=1, minutes=45)
+                "timestamp": now - timedelta(hours=1, minutes=45)
             },
             {
                 "message": "My grandson called me yesterday and we talked for an hour. It made me so happy!",
@@ -200,7 +202,7 @@ def initialize_sample_data():
                 "sentiment_score": 0.8,
                 "sentiment_label": "positive",
                 "conversation_type": "general",
-                "timestamp": datetime.now() - timedelta(days=1, hours=3)
+                "timestamp": now - timedelta(days=1, hours=3)
             },
             {
                 "message": "I'm feeling a bit lonely today. My usual walking group cancelled because of the weather.",
@@ -208,7 +210,7 @@ def initialize_sample_data():
                 "sentiment_score": -0.4,
                 "sentiment_label": "negative",
                 "conversation_type": "general",
-                "timestamp": datetime.now() - timedelta(days=2, hours=5)
+                "timestamp": now - timedelta(days=2, hours=5)
             },
             {
                 "message": "I've been having some trouble remembering things lately. Yesterday I couldn't remember if I took my morning pills.",
@@ -216,7 +218,7 @@ def initialize_sample_data():
                 "sentiment_score": -0.6,
                 "sentiment_label": "negative",
                 "conversation_type": "general",
-                "timestamp": datetime.now() - timedelta(days=3, hours=2)
+                "timestamp": now - timedelta(days=3, hours=2)
             }
         ]
         
@@ -227,7 +229,7 @@ def initialize_sample_data():
                 "sentiment_score": 0.6,
                 "sentiment_label": "positive",
                 "conversation_type": "general",
-                "timestamp": datetime.now() - timedelta(hours=4)
+                "timestamp": now - timedelta(hours=4)
             },
             {
                 "message": "I'm worried about my cholesterol levels. The doctor wants to see me again next month.",
@@ -235,7 +237,7 @@ def initialize_sample_data():
                 "sentiment_score": -0.3,
                 "sentiment_label": "negative",
                 "conversation_type": "general",
-                "timestamp": datetime.now() - timedelta(days=1, hours=6)
+                "timestamp": now - timedelta(days=1, hours=6)
             },
             {
                 "message": "I played chess online with my old colleague today. I won two games!",
@@ -243,103 +245,48 @@ def initialize_sample_data():
                 "sentiment_score": 0.7,
                 "sentiment_label": "positive",
                 "conversation_type": "general",
-                "timestamp": datetime.now() - timedelta(days=2, hours=3)
+                "timestamp": now - timedelta(days=2, hours=3)
             }
         ]
         
-        # Save conversations
-        for conv_data in sample_conversations_user1:
-            ConversationCRUD.save_conversation(
-                user_id=user1.id,
-                message=conv_data["message"],
-                response=conv_data["response"],
-                sentiment_score=conv_data["sentiment_score"],
-                sentiment_label=conv_data["sentiment_label"],
-                conversation_type=conv_data["conversation_type"]
-            )
-        
-        for conv_data in sample_conversations_user2:
-            ConversationCRUD.save_conversation(
-                user_id=user2.id,
-                message=conv_data["message"],
-                response=conv_data["response"],
-                sentiment_score=conv_data["sentiment_score"],
-                sentiment_label=conv_data["sentiment_label"],
-                conversation_type=conv_data["conversation_type"]
-            )
+        # Save conversations in one batch, keeping their sample timestamps
+        conversation_rows = [
+            {"user_id": user1.id, **conv_data} for conv_data in sample_conversations_user1
+        ] + [
+            {"user_id": user2.id, **conv_data} for conv_data in sample_conversations_user2
+        ]
+        ConversationCRUD.bulk_save_conversations(conversation_rows)
         
         print(f"Created {len(sample_conversations_user1) + len(sample_conversations_user2)} sample conversations")
         
         # Create sample medication logs (showing some adherence patterns)
-        # Dorothy's medication logs - good adherence with a few missed doses
+        # (user, medication, hour, minute, minutes late when taken, days ago the dose was missed)
+        dose_schedule = [
+            # Dorothy's medication logs - good adherence with a few missed doses
+            (user1, med1, 9, 0, 15, {1, 4}),   # Lisinopril (morning)
+            (user1, med2, 8, 0, 10, {1}),      # Metformin (morning)
+            (user1, med2, 20, 0, 5, {1, 4}),   # Metformin (evening)
+            (user1, med3, 9, 5, 5, set()),     # Vitamin D - Dorothy is consistent with vitamins
+            # Robert's medication logs - very good adherence
+            (user2, med4, 21, 0, 10, set()),   # Atorvastatin (evening)
+            (user2, med5, 9, 0, 5, {2}),       # Aspirin (morning) - only missed once
+        ]
+        
+        log_rows = []
         for i in range(7):  # Last 7 days
-            day = datetime.now() - timedelta(days=i)
-            
-            # Lisinopril (morning)
-            morning_time = day.replace(hour=9, minute=0, second=0, microsecond=0)
-            status = "taken" if i not in [1, 4] else "missed"  # Missed on day 1 and 4
-            MedicationLogCRUD.log_medication_taken(
-                user_id=user1.id,
-                medication_id=med1.id,
-                scheduled_time=morning_time,
-                taken_time=morning_time + timedelta(minutes=15) if status == "taken" else None,
-                status=status
-            )
-            
-            # Metformin (morning and evening)
-            morning_metformin = day.replace(hour=8, minute=0, second=0, microsecond=0)
-            evening_metformin = day.replace(hour=20, minute=0, second=0, microsecond=0)
-            
-            MedicationLogCRUD.log_medication_taken(
-                user_id=user1.id,
-                medication_id=med2.id,
-                scheduled_time=morning_metformin,
-                taken_time=morning_metformin + timedelta(minutes=10) if i != 1 else None,
-                status="taken" if i != 1 else "missed"
-            )
-            
-            MedicationLogCRUD.log_medication_taken(
-                user_id=user1.id,
-                medication_id=med2.id,
-                scheduled_time=evening_metformin,
-                taken_time=evening_metformin + timedelta(minutes=5) if i not in [1, 4] else None,
-                status="taken" if i not in [1, 4] else "missed"
-            )
-            
-            # Vitamin D
-            vitamin_d_time = day.replace(hour=9, minute=5, second=0, microsecond=0)
-            MedicationLogCRUD.log_medication_taken(
-                user_id=user1.id,
-                medication_id=med3.id,
-                scheduled_time=vitamin_d_time,
-                taken_time=vitamin_d_time + timedelta(minutes=5),
-                status="taken"  # Dorothy is consistent with vitamins
-            )
-        
-        # Robert's medication logs - very good adherence
-        for i in range(7):
-            day = datetime.now() - timedelta(days=i)
-            
-            # Atorvastatin (evening)
-            evening_time = day.replace(hour=21, minute=0, second=0, microsecond=0)
-            MedicationLogCRUD.log_medication_taken(
-                user_id=user2.id,
-                medication_id=med4.id,
-                scheduled_time=evening_time,
-                taken_time=evening_time + timedelta(minutes=10),
-                status="taken"
-            )
-            
-            # Aspirin (morning)
-            morning_aspirin = day.replace(hour=9, minute=0, second=0, microsecond=0)
-            status = "taken" if i != 2 else "missed"  # Only missed once
-            MedicationLogCRUD.log_medication_taken(
-                user_id=user2.id,
-                medication_id=med5.id,
-                scheduled_time=morning_aspirin,
-                taken_time=morning_aspirin + timedelta(minutes=5) if status == "taken" else None,
-                status=status
-            )
+            day = now - timedelta(days=i)
+            for user, med, hour, minute, delay, missed_days in dose_schedule:
+                scheduled_time = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                missed = i in missed_days
+                log_rows.append({
+                    "user_id": user.id,
+                    "medication_id": med.id,
+                    "scheduled_time": scheduled_time,
+                    "taken_time": None if missed else scheduled_time + timedelta(minutes=delay),
+                    "status": "missed" if missed else "taken"
+                })
+        
+        MedicationLogCRUD.bulk_log(log_rows)
         
         print("Created sample medication logs")
         
@@ -349,7 +296,7 @@ def initialize_sample_data():
             reminder_type="checkin",
             title="Good Morning Check-in",
             message="Good morning Dorothy! How are you feeling today? Did you sleep well?",
-            scheduled_time=datetime.now() + timedelta(hours=1)
+            scheduled_time=now + timedelta(hours=1)
         )
         
         ReminderCRUD.create_reminder(
@@ -357,7 +304,7 @@ def initialize_sample_data():
             reminder_type="medication",
             title="Evening Metformin Reminder",
             message="Hi Dorothy, it's time for your evening Metformin (500mg). Remember to take it with food!",
-            scheduled_time=datetime.now() + timedelta(hours=8),
+            scheduled_time=now + timedelta(hours=8),
             medication_id=med2.id
         )
         
@@ -366,7 +313,7 @@ def initialize_sample_data():
             reminder_type="medication",
             title="Evening Atorvastatin",
             message="Good evening Robert, time for your Atorvastatin (20mg). Remember to avoid grapefruit!",
-            scheduled_time=datetime.now() + timedelta(hours=10),
+            scheduled_time=now + timedelta(hours=10),
             medication_id=med4.id
         )
         
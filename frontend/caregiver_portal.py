@@ -1,16 +1,75 @@
 import streamlit as st
+import altair as alt
+import numpy as np
 import pandas as pd
-import plotly.express as px
 from datetime import datetime, timedelta
 from typing import List
 
 from app.database.crud import (
     UserCRUD, CaregiverPatientCRUD, CaregiverAlertCRUD,
-    MedicationLogCRUD, ConversationCRUD
+    MedicationCRUD, MedicationLogCRUD, ConversationCRUD
 )
 from app.auth.auth_utils import authenticate_user
 from utils.sentiment_analysis import get_sentiment_emoji, get_sentiment_color
 
+# Conversations shown per "Load more" step in the conversations tab
+CONVERSATION_PAGE_SIZE = 10
+
+# Indexed by alert severity code; the last slot doubles as the fallback for code -1
+_SEVERITY_ICONS = ("🟢", "🟡", "🔴", "⚪")
+
+# Read-only patient data is cached briefly so tab switches and filter changes
+# don't re-query the database on every rerun
+@st.cache_data(ttl=60)
+def _get_patient(patient_id: int):
+    """Get a patient record"""
+    return UserCRUD.get_user(patient_id)
+
+@st.cache_data(ttl=60)
+def _get_overview(patient_id: int):
+    """Get a patient's 7-day adherence, average mood and alert counts"""
+    return CaregiverPatientCRUD.get_patient_overview_bundle(patient_id, days=7)
+
+@st.cache_data(ttl=60)
+def _get_medication_logs(patient_id: int) -> list:
+    """Get a patient's medication logs for the last 7 days"""
+    return MedicationLogCRUD.get_medication_logs(patient_id, days=7)
+
+@st.cache_data(ttl=60)
+def _get_recent_sentiment(patient_id: int) -> list:
+    """Get a patient's conversations with sentiment from the last 7 days"""
+    return ConversationCRUD.get_recent_sentiment_data(patient_id, days=7)
+
+@st.cache_data(ttl=60)
+def _get_unresolved_alerts(patient_id: int) -> list:
+    """Get a patient's unresolved alerts"""
+    return CaregiverAlertCRUD.get_unresolved_alerts(patient_id)
+
+@st.cache_data(ttl=60)
+def _get_medications(patient_id: int) -> list:
+    """Get a patient's active medications"""
+    return MedicationCRUD.get_user_medications(patient_id)
+
+def _load_conversation_page(pager: dict, patient_id: int):
+    """Append the next page of a patient's conversations to the pager"""
+    page = ConversationCRUD.get_user_conversations(
+        patient_id, limit=CONVERSATION_PAGE_SIZE, offset=len(pager["conversations"])
+    )
+    pager["conversations"].extend(page)
+    pager["labels"].extend(pd.DatetimeIndex([conv.timestamp for conv in page]).strftime('%m/%d %I:%M %p'))
+    pager["exhausted"] = len(page) < CONVERSATION_PAGE_SIZE
+
+def _trend_chart(data: pd.DataFrame, y: str, domain: List[float], threshold: float, threshold_color: str) -> alt.LayerChart:
+    """Daily trend line with a dashed reference line"""
+    line = alt.Chart(data).mark_line(point=True).encode(
+        x=alt.X("date:T", title="date"),
+        y=alt.Y(f"{y}:Q", scale=alt.Scale(domain=domain))
+    )
+    rule = alt.Chart(pd.DataFrame({y: [threshold]})).mark_rule(
+        strokeDash=[6, 4], color=threshold_color
+    ).encode(y=f"{y}:Q")
+    return line + rule
+
 def show_caregiver_login():
     """Show caregiver login page"""
     st.title("🏥 Caregiver Portal - Login")
@@ -82,32 +141,33 @@ def show_caregiver_dashboard():
     with tab4:
         show_patient_conversations(selected_patient_id)
 
+@st.fragment
 def show_patient_overview(patient_id: int):
     """Show patient overview for caregiver"""
-    patient = UserCRUD.get_user(patient_id)
+    patient = _get_patient(patient_id)
     
     st.subheader(f"Overview for {patient.name}")
     
     # Key metrics
+    overview = _get_overview(patient_id)
+    adherence = overview.adherence
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        adherence = MedicationLogCRUD.get_medication_adherence(patient_id, days=7)
         st.metric("7-Day Adherence", f"{adherence.get('adherence_rate', 0):.0f}%")
     
     with col2:
-        conversations = ConversationCRUD.get_recent_sentiment_data(patient_id, days=7)
-        if conversations:
-            avg_mood = sum(c.sentiment_score for c in conversations if c.sentiment_score) / len([c for c in conversations if c.sentiment_score])
+        avg_mood = overview.avg_sentiment
+        if avg_mood is not None:
             mood_emoji = get_sentiment_emoji(avg_mood)
             st.metric("Avg Mood (7d)", f"{mood_emoji} {avg_mood:.2f}")
         else:
             st.metric("Avg Mood (7d)", "No data")
     
     with col3:
-        alerts = CaregiverAlertCRUD.get_unresolved_alerts(patient_id)
-        high_priority = len([a for a in alerts if a.severity == "high"])
-        st.metric("Active Alerts", len(alerts), delta=f"{high_priority} high priority" if high_priority > 0 else None)
+        alert_counts = overview.alert_counts
+        high_priority = alert_counts.get("high", 0)
+        st.metric("Active Alerts", sum(alert_counts.values()), delta=f"{high_priority} high priority" if high_priority > 0 else None)
     
     with col4:
         missed_meds = adherence.get("missed", 0)
@@ -120,62 +180,50 @@ def show_patient_overview(patient_id: int):
     
     with col1:
         st.subheader("Medication Adherence Trend")
-        if adherence.get("logs"):
-            df = pd.DataFrame([
-                {
-                    "date": log.scheduled_time.date(),
-                    "status": "Taken" if log.status == "taken" else "Missed"
-                }
-                for log in adherence["logs"]
-            ])
+        logs = _get_medication_logs(patient_id)
+        if logs:
+            df = pd.DataFrame({
+                "date": pd.DatetimeIndex([log.scheduled_time for log in logs]).normalize(),
+                "taken": np.fromiter((log.status == "taken" for log in logs), dtype=np.int8, count=len(logs))
+            })
             
-            daily_adherence = df.groupby("date").apply(
-                lambda x: (x["status"] == "Taken").sum() / len(x) * 100
-            ).reset_index(name="adherence_rate")
-            daily_adherence["date"] = pd.to_datetime(daily_adherence["date"])
+            daily_adherence = (
+                df.groupby("date", sort=True)["taken"].mean().mul(100)
+                .reset_index(name="adherence_rate")
+            )
             
-            fig = px.line(
-                daily_adherence, 
-                x="date", 
-                y="adherence_rate",
-                range_y=[0, 100]
+            st.altair_chart(
+                _trend_chart(daily_adherence, "adherence_rate", [0, 100], 80, "orange"),
+                use_container_width=True
             )
-            fig.add_hline(y=80, line_dash="dash", line_color="orange")
-            st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("No medication data available")
     
     with col2:
         st.subheader("Mood Trend")
+        conversations = _get_recent_sentiment(patient_id)
         if conversations:
-            df_mood = pd.DataFrame([
-                {
-                    "date": conv.timestamp.date(),
-                    "sentiment_score": conv.sentiment_score
-                }
-                for conv in conversations
-                if conv.sentiment_score is not None
-            ])
+            scored = [conv for conv in conversations if conv.sentiment_score is not None]
+            df_mood = pd.DataFrame({
+                "date": pd.DatetimeIndex([conv.timestamp for conv in scored]).normalize(),
+                "sentiment_score": np.fromiter((conv.sentiment_score for conv in scored), dtype=np.float64, count=len(scored))
+            })
             
-            daily_mood = df_mood.groupby("date")["sentiment_score"].mean().reset_index()
-            daily_mood["date"] = pd.to_datetime(daily_mood["date"])
+            daily_mood = df_mood.groupby("date", sort=True)["sentiment_score"].mean().reset_index()
             
-            fig = px.line(
-                daily_mood, 
-                x="date", 
-                y="sentiment_score",
-                range_y=[-1, 1]
+            st.altair_chart(
+                _trend_chart(daily_mood, "sentiment_score", [-1, 1], 0, "gray"),
+                use_container_width=True
             )
-            fig.add_hline(y=0, line_dash="dash", line_color="gray")
-            st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("No mood data available")
 
+@st.fragment
 def show_patient_alerts(patient_id: int):
     """Show patient alerts for caregiver"""
     st.subheader("Patient Alerts")
     
-    alerts = CaregiverAlertCRUD.get_unresolved_alerts(patient_id)
+    alerts = _get_unresolved_alerts(patient_id)
     
     if not alerts:
         st.success("No active alerts!")
@@ -189,15 +237,12 @@ def show_patient_alerts(patient_id: int):
     )
     
     filtered_alerts = [a for a in alerts if a.severity in severity_filter]
+    created_labels = pd.DatetimeIndex([a.created_at for a in filtered_alerts]).strftime('%m/%d %I:%M %p')
     
-    for alert in filtered_alerts:
-        severity_color = {
-            "high": "🔴",
-            "medium": "🟡",
-            "low": "🟢"
-        }.get(alert.severity, "⚪")
+    for alert, created_label in zip(filtered_alerts, created_labels):
+        severity_color = _SEVERITY_ICONS[alert.severity_code]
         
-        with st.expander(f"{severity_color} {alert.title} - {alert.created_at.strftime('%m/%d %I:%M %p')}"):
+        with st.expander(f"{severity_color} {alert.title} - {created_label}"):
             st.write(f"**Type:** {alert.alert_type}")
             st.write(f"**Severity:** {alert.severity}")
             st.write(f"**Description:**")
@@ -205,22 +250,28 @@ def show_patient_alerts(patient_id: int):
             
             if st.button("Mark as Resolved", key=f"resolve_{alert.id}"):
                 CaregiverAlertCRUD.resolve_alert(alert.id)
+                _get_unresolved_alerts.clear()
+                _get_overview.clear()
                 st.success("Alert resolved!")
+                # Full rerun: the overview's alert metrics live outside this fragment
                 st.rerun()
 
+@st.fragment
 def show_patient_medications(patient_id: int):
     """Show patient medications for caregiver"""
     st.subheader("Medication Schedule & History")
     
-    from app.database.crud import MedicationCRUD
-    import json
-    
-    medications = MedicationCRUD.get_user_medications(patient_id)
+    medications = _get_medications(patient_id)
     
     if not medications:
         st.info("No medications on file")
         return
     
+    # One fetch for all medications, bucketed by medication id
+    logs_by_med = {}
+    for log in _get_medication_logs(patient_id):
+        logs_by_med.setdefault(log.medication_id, []).append(log)
+    
     for med in medications:
         with st.expander(f"{med.name} - {med.dosage}"):
             col1, col2 = st.columns(2)
@@ -228,14 +279,12 @@ def show_patient_medications(patient_id: int):
             with col1:
                 st.write(f"**Frequency:** {med.frequency}")
                 if med.schedule_times:
-                    times = json.loads(med.schedule_times)
-                    st.write(f"**Schedule:** {', '.join(times)}")
+                    st.write(f"**Schedule:** {', '.join(med.schedule_times)}")
                 if med.instructions:
                     st.write(f"**Instructions:** {med.instructions}")
             
             with col2:
-                adherence = MedicationLogCRUD.get_medication_adherence(patient_id, days=7)
-                med_logs = [log for log in adherence.get("logs", []) if log.medication_id == med.id]
+                med_logs = logs_by_med.get(med.id, [])
                 
                 if med_logs:
                     st.write("**Recent Activity (Last 7 days):**")
@@ -243,23 +292,39 @@ def show_patient_medications(patient_id: int):
                         status_emoji = "✅" if log.status == "taken" else "❌"
                         st.write(f"{status_emoji} {log.scheduled_time.strftime('%m/%d %I:%M %p')}")
 
+@st.fragment
 def show_patient_conversations(patient_id: int):
     """Show patient conversations for caregiver"""
     st.subheader("Recent Conversations")
     
-    conversations = ConversationCRUD.get_user_conversations(patient_id, limit=20)
+    # Loaded pages are kept in session state so "Load more" only fetches the next page;
+    # a new conversation shifts every offset, so start over from the newest page
+    latest_id = ConversationCRUD.get_latest_conversation_id(patient_id)
+    pager_key = f"conversation_pager_{patient_id}"
+    pager = st.session_state.get(pager_key)
+    if pager is None or pager["latest_id"] != latest_id:
+        pager = {"latest_id": latest_id, "conversations": [], "labels": [], "exhausted": False}
+        st.session_state[pager_key] = pager
+        _load_conversation_page(pager, patient_id)
+    
+    conversations = pager["conversations"]
     
     if not conversations:
         st.info("No conversations yet")
         return
     
-    for conv in conversations:
+    for conv, timestamp_label in zip(conversations, pager["labels"]):
         sentiment_emoji = get_sentiment_emoji(conv.sentiment_score or 0)
         sentiment_color = get_sentiment_color(conv.sentiment_score or 0)
         
-        with st.expander(f"{sentiment_emoji} {conv.timestamp.strftime('%m/%d %I:%M %p')} - {conv.conversation_type}"):
+        with st.expander(f"{sentiment_emoji} {timestamp_label} - {conv.conversation_type}"):
             st.write(f"**Patient:** {conv.message}")
             st.write(f"**Carely:** {conv.response}")
             
             if conv.sentiment_score is not None:
                 st.caption(f"Mood: {conv.sentiment_label} (score: {conv.sentiment_score:.2f})")
+    
+    if not pager["exhausted"]:
+        # The callback runs before the rerun, so the new page renders on the same click
+        st.button("Load more", key=f"load_more_conversations_{patient_id}",
+                  on_click=_load_conversation_page, args=(pager, patient_id))
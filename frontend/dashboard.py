@@ -3,7 +3,6 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta, time
-import json
 from typing import List, Dict, Any
 from streamlit_mic_recorder import speech_to_text
 
@@ -209,18 +208,15 @@ def show_emergency_safety_sheet(user_id: int, concerns: list, severity: str, mes
             caregivers = CaregiverPatientCRUD.get_patient_caregivers(user_id)
             
             if caregivers:
-                alert_sent = False
-                for caregiver in caregivers:
-                    if caregiver.telegram_chat_id:
-                        result = send_emergency_alert(
-                            chat_id=caregiver.telegram_chat_id,
-                            patient_name=user.name,
-                            concerns=concerns,
-                            severity=severity,
-                            message=message
-                        )
-                        if result.get("success"):
-                            alert_sent = True
+                chat_ids = [caregiver.telegram_chat_id for caregiver in caregivers if caregiver.telegram_chat_id]
+                results = send_emergency_alert(
+                    chat_ids=chat_ids,
+                    patient_name=user.name,
+                    concerns=concerns,
+                    severity=severity,
+                    message=message
+                ) if chat_ids else []
+                alert_sent = any(result.get("success") for result in results)
                 
                 if alert_sent:
                     st.success("✅ **Help is on the way!**")
@@ -468,16 +464,15 @@ def show_medication_management(user_id: int):
                 with col1:
                     st.write(f"**Frequency:** {med.frequency}")
                     if med.schedule_times:
-                        times = json.loads(med.schedule_times)
-                        st.write(f"**Times:** {', '.join(times)}")
+                        st.write(f"**Times:** {', '.join(med.schedule_times)}")
                     if med.instructions:
                         st.write(f"**Instructions:** {med.instructions}")
                     st.write(f"**Active:** {'Yes' if med.active else 'No'}")
                 
                 with col2:
                     # Recent logs for this medication
-                    adherence = MedicationLogCRUD.get_medication_adherence(user_id, days=7)
-                    med_logs = [log for log in adherence.get("logs", []) if log.medication_id == med.id]
+                    recent_logs = MedicationLogCRUD.get_medication_logs(user_id, days=7)
+                    med_logs = [log for log in recent_logs if log.medication_id == med.id]
                     
                     if med_logs:
                         st.write("**Recent Activity:**")
@@ -509,6 +504,7 @@ def show_medication_management(user_id: int):
     days = 7 if period == "Last 7 days" else 30
     
     adherence = MedicationLogCRUD.get_medication_adherence(user_id, days=days)
+    logs = MedicationLogCRUD.get_medication_logs(user_id, days=days)
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -519,14 +515,14 @@ def show_medication_management(user_id: int):
         st.metric("Adherence Rate", f"{adherence.get('adherence_rate', 0):.1f}%")
     
     # Adherence chart
-    if adherence.get("logs"):
+    if logs:
         df = pd.DataFrame([
             {
                 "date": log.scheduled_time.date(),
                 "status": log.status,
                 "medication": next((med.name for med in medications if med.id == log.medication_id), "Unknown")
             }
-            for log in adherence["logs"]
+            for log in logs
         ])
         
         # Group by date and calculate daily adherence
@@ -610,6 +606,7 @@ def show_health_insights(user_id: int):
     # Get data
     conversations = ConversationCRUD.get_recent_sentiment_data(user_id, days=days)
     adherence = MedicationLogCRUD.get_medication_adherence(user_id, days=days)
+    medication_logs = MedicationLogCRUD.get_medication_logs(user_id, days=days)
     
     # Summary metrics
     st.subheader("📈 Summary")
@@ -703,7 +700,7 @@ def show_health_insights(user_id: int):
                 st.plotly_chart(fig_hourly, use_container_width=True)
     
     # Medication insights
-    if adherence.get("logs"):
+    if medication_logs:
         st.subheader("💊 Medication Insights")
         
         # Weekly adherence pattern
@@ -714,7 +711,7 @@ def show_health_insights(user_id: int):
                 "status": log.status,
                 "hour": log.scheduled_time.hour
             }
-            for log in adherence["logs"]
+            for log in medication_logs
         ])
         
         col1, col2 = st.columns(2)
@@ -889,13 +886,9 @@ def show_user_management():
                 with col2:
                     st.write(f"**Created:** {user.created_at.strftime('%m/%d/%Y')}")
                     if user.preferences:
-                        try:
-                            prefs = json.loads(user.preferences)
-                            st.write("**Preferences:**")
-                            for key, value in prefs.items():
-                                st.write(f"- {key}: {value}")
-                        except:
-                            st.write("**Preferences:** Invalid format")
+                        st.write("**Preferences:**")
+                        for key, value in user.preferences.items():
+                            st.write(f"- {key}: {value}")
                     
                     # Quick stats
                     conversations = ConversationCRUD.get_user_conversations(user.id, limit=1)
@@ -1,10 +1,9 @@
 import streamlit as st
 import asyncio
-import threading
 import time
 from datetime import datetime, timedelta
 from app.database.models import create_tables
-from app.scheduling.reminder_scheduler import ReminderScheduler
+from app.scheduling.reminder_scheduler import start_scheduler
 from frontend.dashboard import run_dashboard
 from frontend.caregiver_portal import show_caregiver_dashboard
 from data.sample_data import initialize_sample_data
@@ -16,12 +15,8 @@ def initialize_app():
     create_tables()
     initialize_sample_data()
     
-    # Start the reminder scheduler in a separate thread
-    scheduler = ReminderScheduler()
-    scheduler_thread = threading.Thread(target=scheduler.start, daemon=True)
-    scheduler_thread.start()
-    
-    return scheduler
+    # Start the reminder scheduler in a separate thread (no-op if already running)
+    return start_scheduler()
 
 def main():
     st.set_page_config(
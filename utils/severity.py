@@ -0,0 +1,7 @@
+# Alert severities in ascending order; each one's index is its severity code
+ALERT_SEVERITIES = ("low", "medium", "high")
+_SEVERITY_CODES = {severity: code for code, severity in enumerate(ALERT_SEVERITIES)}
+
+def get_severity_code(severity: str) -> int:
+    """Map an alert severity to 0 (low) through 2 (high), or -1 if unrecognised"""
+    return _SEVERITY_CODES.get(severity, -1)
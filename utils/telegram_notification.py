@@ -1,12 +1,86 @@
+import asyncio
 import os
+import threading
+from concurrent.futures import Future
+import httpx
+import orjson
 import requests
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Union
+from requests.adapters import HTTPAdapter, Retry
+from utils.severity import get_severity_code
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# How long a blocking bulk send waits for every message to be delivered
+BULK_SEND_TIMEOUT = 30  # seconds
+
+# Transient failures retried by both the sync and async senders
+_RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+_MAX_RETRIES = 3
+_RETRY_BACKOFF = 0.2  # seconds, doubled on each retry
+_MAX_RETRY_AFTER = 10  # seconds; longest Retry-After wait honoured per attempt
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, preferring the server's Retry-After hint"""
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return min(float(retry_after), _MAX_RETRY_AFTER)
+    return _RETRY_BACKOFF * (2 ** attempt)
+
+# Background event loop that delivers messages submitted without waiting
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Get the notification event loop, starting its daemon thread on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="telegram-notifier", daemon=True).start()
+        return _loop
 
 class TelegramNotifier:
+    # Indexed by alert severity code (low, medium, high); the last slot is the fallback for code -1
+    _SEVERITY_EMOJI = ("ℹ️", "⚠️", "🚨", "ℹ️")
+    
+    _ALERT_TMPL = """
+{emoji} <b>EMERGENCY ALERT - {severity} PRIORITY</b> {emoji}
+
+<b>Patient:</b> {patient_name}
+
+<b>Health Concerns Detected:</b>
+{concerns_text}
+
+<b>Original Message:</b>
+"{message}"
+
+<b>Time:</b> {time}
+
+⚡ Please check on the patient immediately!
+"""
+    
     def __init__(self):
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
         
+        # Reuse pooled keep-alive connections to the Bot API instead of a new TLS handshake per message.
+        # POST is retried on transient errors: a duplicate alert is preferable to a lost one.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(
+                total=_MAX_RETRIES,
+                backoff_factor=_RETRY_BACKOFF,
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=frozenset(["POST"])
+            )
+        )
+        self.session.mount("https://", adapter)
+        self._async_client: Optional[httpx.AsyncClient] = None  # created on the event loop that uses it
+        
     def send_message(self, chat_id: str, message: str, parse_mode: str = "HTML") -> Dict[str, Any]:
         """
         Send a message to a Telegram chat
@@ -19,96 +93,163 @@ class TelegramNotifier:
         Returns:
             Response from Telegram API
         """
-        if not self.bot_token:
-            return {"success": False, "error": "Telegram bot token not configured"}
-            
-        if not chat_id:
-            return {"success": False, "error": "Chat ID not provided"}
+        error = self._check_config(chat_id)
+        if error:
+            return error
             
         try:
-            url = f"{self.base_url}/sendMessage"
-            payload = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': parse_mode
-            }
-            
-            response = requests.post(url, json=payload)
-            result = response.json()
+            response = self.session.post(
+                f"{self.base_url}/sendMessage",
+                data=orjson.dumps(self._build_payload(chat_id, message, parse_mode)),
+                headers=_JSON_HEADERS,
+                timeout=(3, 10)
+            )
+            return self._parse_result(orjson.loads(response.content))
+                
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def async_send_message(self, chat_id: str, message: str, parse_mode: str = "HTML") -> Dict[str, Any]:
+        """Send a message to a Telegram chat without blocking the event loop"""
+        error = self._check_config(chat_id)
+        if error:
+            return error
             
-            if result.get("ok"):
-                return {"success": True, "message_id": result.get("result", {}).get("message_id")}
-            else:
-                return {"success": False, "error": result.get("description", "Unknown error")}
+        try:
+            body = orjson.dumps(self._build_payload(chat_id, message, parse_mode))
+            # Retry 429/5xx like the sync session does; the transport only retries failed connects
+            for attempt in range(_MAX_RETRIES + 1):
+                response = await self._get_async_client().post(
+                    f"{self.base_url}/sendMessage", content=body, headers=_JSON_HEADERS
+                )
+                if response.status_code not in _RETRY_STATUSES or attempt == _MAX_RETRIES:
+                    break
+                await asyncio.sleep(_retry_delay(response, attempt))
+            return self._parse_result(orjson.loads(response.content))
                 
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def send_bulk(self, chat_ids: List[str], message: str, parse_mode: str = "HTML") -> List[Dict[str, Any]]:
+        """Send the same message to several chats concurrently"""
+        results = await asyncio.gather(
+            *(self.async_send_message(chat_id, message, parse_mode) for chat_id in chat_ids),
+            return_exceptions=True
+        )
+        return [
+            {"success": False, "error": str(result)} if isinstance(result, BaseException) else result
+            for result in results
+        ]
+    
+    def submit_bulk(self, chat_ids: List[str], message: str, parse_mode: str = "HTML") -> Future:
+        """
+        Queue a message to several chats on the background loop and return immediately
+        
+        The returned future resolves to one send_message-style result dict per chat.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.send_bulk(chat_ids, message, parse_mode), _get_loop()
+        )
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the pooled async HTTP client, creating it on first use"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=3.0),
+                transport=httpx.AsyncHTTPTransport(
+                    retries=3,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+                )
+            )
+        return self._async_client
+    
+    def _check_config(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Return an error result if a message cannot be sent"""
+        if not self.bot_token:
+            return {"success": False, "error": "Telegram bot token not configured"}
+        if not chat_id:
+            return {"success": False, "error": "Chat ID not provided"}
+        return None
+    
+    def _build_payload(self, chat_id: str, message: str, parse_mode: str) -> Dict[str, Any]:
+        """Build a sendMessage request body"""
+        return {
+            'chat_id': chat_id,
+            'text': message,
+            'parse_mode': parse_mode
+        }
+    
+    def _parse_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a Telegram API response into a success/error result"""
+        if result.get("ok"):
+            return {"success": True, "message_id": result.get("result", {}).get("message_id")}
+        return {"success": False, "error": result.get("description", "Unknown error")}
+    
     def send_emergency_alert(
         self, 
-        chat_id: str, 
+        chat_ids: Union[str, List[str]], 
         patient_name: str, 
         concerns: list, 
         severity: str,
         message: str
-    ) -> Dict[str, Any]:
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
         """
-        Send an emergency alert to a caregiver
+        Send an emergency alert to one or more caregivers
         
         Args:
-            chat_id: Caregiver's Telegram chat ID
+            chat_ids: Caregiver's Telegram chat ID, or a list of them
             patient_name: Name of the patient
             concerns: List of health concerns detected
             severity: Severity level (low, medium, high)
             message: Original message from patient
             
         Returns:
-            Response from Telegram API
+            Response from Telegram API, or one response per chat ID when given a list
         """
-        severity_emoji = {
-            "high": "🚨",
-            "medium": "⚠️",
-            "low": "ℹ️"
-        }
+        alert_message = self._format_emergency_alert(patient_name, concerns, severity, message)
         
-        emoji = severity_emoji.get(severity, "ℹ️")
-        concerns_text = "\n".join([f"• {c}" for c in concerns])
+        if isinstance(chat_ids, str):
+            return self.send_message(chat_ids, alert_message, parse_mode="HTML")
         
-        alert_message = f"""
-{emoji} <b>EMERGENCY ALERT - {severity.upper()} PRIORITY</b> {emoji}
-
-<b>Patient:</b> {patient_name}
-
-<b>Health Concerns Detected:</b>
-{concerns_text}
-
-<b>Original Message:</b>
-"{message}"
-
-<b>Time:</b> {self._get_current_time()}
-
-⚡ Please check on the patient immediately!
-"""
+        # Fan out to every caregiver at once rather than one round trip after another
+        try:
+            return self.submit_bulk(chat_ids, alert_message, parse_mode="HTML").result(timeout=BULK_SEND_TIMEOUT)
+        except Exception as e:
+            return [{"success": False, "error": str(e) or type(e).__name__} for _ in chat_ids]
+    
+    def _format_emergency_alert(self, patient_name: str, concerns: list, severity: str, message: str) -> str:
+        """Render the emergency alert text"""
+        emoji = self._SEVERITY_EMOJI[get_severity_code(severity)]
         
-        return self.send_message(chat_id, alert_message, parse_mode="HTML")
+        return self._ALERT_TMPL.format_map({
+            "emoji": emoji,
+            "severity": severity.upper(),
+            "patient_name": patient_name,
+            "concerns_text": "\n".join(f"• {c}" for c in concerns),
+            "message": message,
+            "time": self._get_current_time()
+        })
     
     def _get_current_time(self) -> str:
         """Get current time in readable format"""
         from datetime import datetime
         return datetime.now().strftime("%I:%M %p, %B %d, %Y")
 
+@lru_cache(maxsize=1)
+def get_notifier() -> TelegramNotifier:
+    """Get the shared notifier, so every message reuses one connection pool"""
+    return TelegramNotifier()
+
 def send_emergency_alert(
-    chat_id: str,
+    chat_ids: Union[str, List[str]],
     patient_name: str,
     concerns: list,
     severity: str,
     message: str
-) -> Dict[str, Any]:
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
     """Helper function to send emergency alert"""
-    notifier = TelegramNotifier()
-    return notifier.send_emergency_alert(chat_id, patient_name, concerns, severity, message)
+    return get_notifier().send_emergency_alert(chat_ids, patient_name, concerns, severity, message)
 
 def send_telegram_message(chat_id: str, message: str) -> Dict[str, Any]:
     """Helper function to send a simple Telegram message"""
-    notifier = TelegramNotifier()
-    return notifier.send_message(chat_id, message)
+    return get_notifier().send_message(chat_id, message)